@@ -2,9 +2,69 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
+import heapq
 import re
 
 
+_MISSION_RE = re.compile(r"\bprj\d+", re.IGNORECASE)
+_PILOT_RE = re.compile(r"\bp\d+", re.IGNORECASE)
+
+# Sheet placeholders meaning "no current assignment"
+_UNASSIGNED = {'–', '', 'None'}
+
+# One alternation per intent so routing scans the query once per intent
+_INTENT_PATTERNS = {
+    intent: re.compile("|".join(re.escape(k) for k in keywords))
+    for intent, keywords in {
+        "conflicts": ["conflict", "issue", "problem", "mismatch", "double book"],
+        "urgent": ["urgent", "priority", "emergency"],
+        "availability": ["available", "availability", "who is available", "free to fly"],
+        "missions": ["mission", "project", "client"],
+        "assignment": ["assign", "allocate", "schedule"],
+        "pilots": ["pilot", "roster"],
+        "drones": ["drone", "fleet", "equipment"],
+    }.items()
+}
+
+
+def _find_overlaps(starts, ends, codes, other_starts, other_ends, other_codes):
+    """
+    Return (i, j) index arrays where window i overlaps window j of a different mission.
+
+    Sweeps both sets of windows in start order, keeping a min-heap of active end
+    dates per set, so only overlapping pairs are visited rather than every pair.
+    All inputs are int64 arrays (day numbers and mission codes); pairs come back
+    ordered by i, then j.
+    """
+    windows = (
+        (starts.tolist(), ends.tolist()),
+        (other_starts.tolist(), other_ends.tolist()),
+    )
+    events = sorted(
+        (start, side, idx) for side, (side_starts, _) in enumerate(windows) for idx, start in enumerate(side_starts)
+    )
+    active = ([], [])
+    pairs_i, pairs_j = [], []
+
+    for start, side, idx in events:
+        end = windows[side][1][idx]
+        opposite = active[1 - side]
+        # Windows that ended before this one starts can't overlap anything later
+        while opposite and opposite[0][0] < start:
+            heapq.heappop(opposite)
+        for _, other_start, other_idx in opposite:
+            if other_start > end:
+                continue
+            i, j = (idx, other_idx) if side == 0 else (other_idx, idx)
+            if codes[i] != other_codes[j]:
+                pairs_i.append(i)
+                pairs_j.append(j)
+        heapq.heappush(active[side], (end, start, idx))
+
+    order = np.lexsort((pairs_j, pairs_i))
+    return np.asarray(pairs_i, dtype=np.intp)[order], np.asarray(pairs_j, dtype=np.intp)[order]
+
+
 class DroneOpsAgent:
     """Intelligent agent for drone operations management with conflict detection"""
     
@@ -22,22 +82,33 @@ class DroneOpsAgent:
         - DroneOpsAgent(pilots_df, drones_df, missions_df)  -> direct DataFrame usage
         """
         # Detect if we've been given a SheetsManager-like object
+        # Shallow copies share the caller's data: preprocessing only replaces whole
+        # columns, and the roster is copied for real before the first in-place write.
         if hasattr(pilots_df_or_manager, "pilots_df") and hasattr(
             pilots_df_or_manager, "drones_df"
         ) and hasattr(pilots_df_or_manager, "missions_df"):
             self.sheets_manager = pilots_df_or_manager
-            self.pilots_df = self.sheets_manager.pilots_df.copy()
-            self.drones_df = self.sheets_manager.drones_df.copy()
-            self.missions_df = self.sheets_manager.missions_df.copy()
+            self.pilots_df = self.sheets_manager.pilots_df.copy(deep=False)
+            self.drones_df = self.sheets_manager.drones_df.copy(deep=False)
+            self.missions_df = self.sheets_manager.missions_df.copy(deep=False)
         else:
             self.sheets_manager = None
-            self.pilots_df = pilots_df_or_manager.copy()
+            self.pilots_df = pilots_df_or_manager.copy(deep=False)
             if drones_df is None or missions_df is None:
                 raise ValueError(
                     "When not passing a SheetsManager, you must provide drones_df and missions_df"
                 )
-            self.drones_df = drones_df.copy()
-            self.missions_df = missions_df.copy()
+            self.drones_df = drones_df.copy(deep=False)
+            self.missions_df = missions_df.copy(deep=False)
+
+        self._owns_pilots = False
+        # Bumped on every roster write; keys the cached assignment groups
+        self._data_version = 0
+        self._assignment_cache = None
+        # The manager groups the same rows on load; reuse it until the first write
+        by_assignment = getattr(self.sheets_manager, "pilots_by_assignment", None)
+        if by_assignment is not None:
+            self._assignment_cache = (0, by_assignment)
 
         self._preprocess_data()
     
@@ -49,28 +120,112 @@ class DroneOpsAgent:
         self.drones_df['maintenance_due'] = pd.to_datetime(self.drones_df['maintenance_due'], errors='coerce')
         self.pilots_df['available_from'] = pd.to_datetime(self.pilots_df['available_from'], errors='coerce')
         
+        # Python dates for per-mission formatting and checks
+        self.missions_df['start_date_d'] = self.missions_df['start_date'].dt.date
+        self.missions_df['end_date_d'] = self.missions_df['end_date'].dt.date
+        
+        # Day-resolution date arrays for vectorized comparisons against today
+        self._start = self.missions_df['start_date'].values.astype('datetime64[D]')
+        self._end = self.missions_df['end_date'].values.astype('datetime64[D]')
+        self._maint_due = self.drones_df['maintenance_due'].values.astype('datetime64[D]')
+        self._mission_dated = ~np.isnat(self._start) & ~np.isnat(self._end)
+        self._mission_codes, self._mission_ids = pd.factorize(self.missions_df['project_id'])
+        
         # Parse skills and certifications
-        self.pilots_df['skills_list'] = self.pilots_df['skills'].fillna('').str.split(',').apply(
-            lambda x: [s.strip().lower() for s in x if s.strip()]
+        self.pilots_df['skills_list'] = self._parse_tokens(self.pilots_df['skills'])
+        self.pilots_df['certs_list'] = self._parse_tokens(self.pilots_df['certifications'])
+        
+        self.missions_df['required_skills_list'] = self._parse_tokens(self.missions_df['required_skills'])
+        self.missions_df['required_certs_list'] = self._parse_tokens(self.missions_df['required_certs'])
+        
+        self.drones_df['capabilities_list'] = self._parse_tokens(self.drones_df['capabilities'])
+        
+        # Replace '–' with None for assignments
+        for df in (self.pilots_df, self.drones_df):
+            df['current_assignment'] = df['current_assignment'].where(
+                ~df['current_assignment'].isin(_UNASSIGNED), None
+            )
+        
+        # Low-cardinality labels as categoricals so equality checks compare integer codes
+        self.pilots_df['status'] = self.pilots_df['status'].astype(
+            self._category_dtype(self.pilots_df['status'], known=('Available', 'Assigned', 'On Leave'))
         )
-        self.pilots_df['certs_list'] = self.pilots_df['certifications'].fillna('').str.split(',').apply(
-            lambda x: [s.strip().lower() for s in x if s.strip()]
+        self.drones_df['status'] = self.drones_df['status'].astype(
+            self._category_dtype(self.drones_df['status'], known=('Available', 'Deployed', 'Maintenance'))
         )
-        
-        self.missions_df['required_skills_list'] = self.missions_df['required_skills'].fillna('').str.split(',').apply(
-            lambda x: [s.strip().lower() for s in x if s.strip()]
+        self.missions_df['priority'] = self.missions_df['priority'].astype(
+            self._category_dtype(self.missions_df['priority'], known=('Urgent', 'High', 'Standard'))
         )
-        self.missions_df['required_certs_list'] = self.missions_df['required_certs'].fillna('').str.split(',').apply(
-            lambda x: [s.strip().lower() for s in x if s.strip()]
+        # Shared categories so pilot and mission locations stay comparable
+        location_dtype = self._category_dtype(
+            self.pilots_df['location'], self.missions_df['location'], self.drones_df['location']
         )
+        for df in (self.pilots_df, self.missions_df, self.drones_df):
+            df['location'] = df['location'].astype(location_dtype)
         
-        self.drones_df['capabilities_list'] = self.drones_df['capabilities'].fillna('').str.split(',').apply(
-            lambda x: [s.strip().lower() for s in x if s.strip()]
-        )
+        # Missions are read-only for the agent, so the urgent slice never goes stale
+        self._urgent_missions = self.missions_df[self.missions_df['priority'] == 'Urgent'].reset_index(drop=True)
         
-        # Replace '–' with None for assignments
-        self.pilots_df['current_assignment'] = self.pilots_df['current_assignment'].replace(['–', '', 'None'], None)
-        self.drones_df['current_assignment'] = self.drones_df['current_assignment'].replace(['–', '', 'None'], None)
+        # Lookup tables so per-ID queries avoid scanning the frames
+        self._mission_by_id = {
+            m.project_id: m
+            for m in self.missions_df.drop_duplicates('project_id').itertuples(index=False)
+        }
+        unique_pilots = self.pilots_df['pilot_id'].drop_duplicates()
+        self._pilot_idx_by_id = dict(zip(unique_pilots.values, unique_pilots.index))
+        
+        # Pilot/mission x skill/cert membership matrices used for vectorized scoring and
+        # mismatch checks; the universes include mission requirements no pilot holds
+        self._all_skills = sorted(set().union(
+            *self.pilots_df['skills_list'], *self.missions_df['required_skills_list']
+        ))
+        self._all_certs = sorted(set().union(
+            *self.pilots_df['certs_list'], *self.missions_df['required_certs_list']
+        ))
+        self._skill_names = np.array(self._all_skills, dtype=object)
+        self._cert_names = np.array(self._all_certs, dtype=object)
+        self._pilot_skill_matrix = self._membership_matrix(self.pilots_df['skills_list'], self._all_skills)
+        self._pilot_cert_matrix = self._membership_matrix(self.pilots_df['certs_list'], self._all_certs)
+        self._mission_skill_matrix = self._membership_matrix(
+            self.missions_df['required_skills_list'], self._all_skills
+        )
+        self._mission_cert_matrix = self._membership_matrix(
+            self.missions_df['required_certs_list'], self._all_certs
+        )
+    
+    @staticmethod
+    def _parse_tokens(column: pd.Series) -> List[frozenset]:
+        """Split comma-separated cells into lowercase token sets in a single pass"""
+        return [
+            frozenset(token.strip().lower() for token in raw.split(',') if token.strip())
+            for raw in column.fillna('').to_numpy()
+        ]
+    
+    @staticmethod
+    def _category_dtype(*columns: pd.Series, known: Tuple[str, ...] = ()) -> pd.CategoricalDtype:
+        """Categorical dtype covering every value in the columns plus any known labels"""
+        values = set(pd.concat(columns).dropna().unique()) | set(known)
+        return pd.CategoricalDtype(sorted(values, key=str))
+    
+    @staticmethod
+    def _membership_matrix(sets: pd.Series, universe: List[str]) -> np.ndarray:
+        """Build a rows x universe boolean matrix marking which items each set contains"""
+        return np.array(
+            [[item in row for item in universe] for row in sets], dtype=bool
+        ).reshape(len(sets), len(universe))
+    
+    def _assignment_groups(self) -> Dict[str, np.ndarray]:
+        """Mission -> assigned pilot row positions, rebuilt only after roster writes"""
+        if self._assignment_cache is None or self._assignment_cache[0] != self._data_version:
+            groups = self.pilots_df.groupby('current_assignment').indices
+            self._assignment_cache = (self._data_version, groups)
+        return self._assignment_cache[1]
+    
+    def _ensure_mutable(self):
+        """Take a private copy of the pilot roster before the first in-place write"""
+        if not self._owns_pilots:
+            self.pilots_df = self.pilots_df.copy()
+            self._owns_pilots = True
     
     def _is_date_valid(self, date_value):
         """Check if date is valid (not NaT)"""
@@ -78,272 +233,270 @@ class DroneOpsAgent:
     
     def detect_all_conflicts(self) -> List[Dict]:
         """Detect all types of conflicts"""
-        conflicts = []
-        today = datetime.now().date()
+        return self.detect_conflicts_frame().to_dict('records')
+    
+    def detect_conflicts_frame(self) -> pd.DataFrame:
+        """Detect all types of conflicts, one row per conflict"""
+        columns = {'type': [], 'severity': [], 'description': [], 'affected_entity': [], 'details': []}
+        
+        def add(conflict_type, severity, description, affected_entity, details):
+            columns['type'].append(conflict_type)
+            columns['severity'].append(severity)
+            columns['description'].append(description)
+            columns['affected_entity'].append(affected_entity)
+            columns['details'].append(details)
+        
+        today_d = np.datetime64(date.today(), 'D')
+        
+        # Pilots joined to the mission they are currently assigned to
+        mission_cols = self.missions_df[['project_id', 'start_date', 'end_date', 'location']].drop_duplicates('project_id')
+        assigned = self.pilots_df.dropna(subset=['current_assignment']).merge(
+            mission_cols.rename(columns={
+                'start_date': 'start_m', 'end_date': 'end_m', 'location': 'location_m'
+            }),
+            left_on='current_assignment',
+            right_on='project_id',
+        )
         
         # 1. Double Booking Detection
-        for _, pilot in self.pilots_df.iterrows():
-            if pd.notna(pilot['current_assignment']):
-                assigned_mission = self.missions_df[
-                    self.missions_df['project_id'] == pilot['current_assignment']
-                ]
-                
-                if not assigned_mission.empty:
-                    mission = assigned_mission.iloc[0]
-                    
-                    # Skip if dates are invalid
-                    if not self._is_date_valid(mission['start_date']) or not self._is_date_valid(mission['end_date']):
-                        continue
-                    
-                    mission_start = mission['start_date'].date()
-                    mission_end = mission['end_date'].date()
-                    
-                    # Find overlapping missions
-                    for _, other_mission in self.missions_df.iterrows():
-                        if other_mission['project_id'] == mission['project_id']:
-                            continue
-                        
-                        # Skip if dates are invalid
-                        if not self._is_date_valid(other_mission['start_date']) or not self._is_date_valid(other_mission['end_date']):
-                            continue
-                        
-                        other_start = other_mission['start_date'].date()
-                        other_end = other_mission['end_date'].date()
-                        
-                        # Check for overlap
-                        if (other_start <= mission_end and other_end >= mission_start):
-                            conflicts.append({
-                                'type': 'Double Booking',
-                                'severity': 'High',
-                                'description': f"Pilot {pilot['name']} assigned to {pilot['current_assignment']} overlaps with {other_mission['project_id']}",
-                                'affected_entity': pilot['pilot_id'],
-                                'details': {
-                                    'pilot': pilot['name'],
-                                    'current_mission': pilot['current_assignment'],
-                                    'conflicting_mission': other_mission['project_id']
-                                }
-                            })
-        
-        # 2. Skill/Certification Mismatch
-        for _, mission in self.missions_df.iterrows():
-            # Skip if dates are invalid
-            if not self._is_date_valid(mission['start_date']) or not self._is_date_valid(mission['end_date']):
+        # Compare each assigned window against every other dated mission as int64 day numbers
+        dated = assigned[assigned['start_m'].notna() & assigned['end_m'].notna()]
+        pilot_pos, other_pos = _find_overlaps(
+            dated['start_m'].values.astype('datetime64[D]').astype(np.int64),
+            dated['end_m'].values.astype('datetime64[D]').astype(np.int64),
+            self._mission_ids.get_indexer(dated['current_assignment']),
+            self._start[self._mission_dated].astype(np.int64),
+            self._end[self._mission_dated].astype(np.int64),
+            self._mission_codes[self._mission_dated],
+        )
+        other_ids = self.missions_df['project_id'].to_numpy()[self._mission_dated]
+        
+        for pilot, other_id in zip(dated.iloc[pilot_pos].itertuples(index=False), other_ids[other_pos]):
+            add(
+                'Double Booking',
+                'High',
+                f"Pilot {pilot.name} assigned to {pilot.current_assignment} overlaps with {other_id}",
+                pilot.pilot_id,
+                {
+                    'pilot': pilot.name,
+                    'current_mission': pilot.current_assignment,
+                    'conflicting_mission': other_id
+                }
+            )
+        
+        # 2. Skill/Certification Mismatch (active or upcoming missions with valid dates)
+        open_missions = self._mission_dated & (
+            ((self._start <= today_d) & (self._end >= today_d)) | (self._start > today_d)
+        )
+        assignment_groups = self._assignment_groups()
+        pilot_names = self.pilots_df['name'].to_numpy()
+        pilot_ids = self.pilots_df['pilot_id'].to_numpy()
+        for pos, project_id in zip(
+            np.flatnonzero(open_missions), self.missions_df['project_id'].to_numpy()[open_missions]
+        ):
+            rows = assignment_groups.get(project_id)
+            if rows is None:
                 continue
             
-            start = mission['start_date'].date()
-            end = mission['end_date'].date()
+            # Required-and-not-held bitmaps for every assigned pilot at once
+            missing_skills = self._mission_skill_matrix[pos] & ~self._pilot_skill_matrix[rows]
+            missing_certs = self._mission_cert_matrix[pos] & ~self._pilot_cert_matrix[rows]
+            flagged = missing_skills.any(axis=1) | missing_certs.any(axis=1)
             
-            # Check if mission is active or upcoming
-            if start <= today <= end or start > today:
-                assigned_pilots = self.pilots_df[
-                    self.pilots_df['current_assignment'] == mission['project_id']
-                ]
-                
-                for _, pilot in assigned_pilots.iterrows():
-                    missing_skills = [
-                        skill for skill in mission['required_skills_list']
-                        if skill not in pilot['skills_list']
-                    ]
-                    missing_certs = [
-                        cert for cert in mission['required_certs_list']
-                        if cert not in pilot['certs_list']
-                    ]
-                    
-                    if missing_skills or missing_certs:
-                        conflicts.append({
-                            'type': 'Skill/Cert Mismatch',
-                            'severity': 'High',
-                            'description': f"Pilot {pilot['name']} lacks required skills/certs for {mission['project_id']}",
-                            'affected_entity': pilot['pilot_id'],
-                            'details': {
-                                'pilot': pilot['name'],
-                                'mission': mission['project_id'],
-                                'missing_skills': missing_skills,
-                                'missing_certs': missing_certs
-                            }
-                        })
+            for row, skills_row, certs_row in zip(rows[flagged], missing_skills[flagged], missing_certs[flagged]):
+                add(
+                    'Skill/Cert Mismatch',
+                    'High',
+                    f"Pilot {pilot_names[row]} lacks required skills/certs for {project_id}",
+                    pilot_ids[row],
+                    {
+                        'pilot': pilot_names[row],
+                        'mission': project_id,
+                        'missing_skills': self._skill_names[skills_row].tolist(),
+                        'missing_certs': self._cert_names[certs_row].tolist()
+                    }
+                )
         
         # 3. Location Mismatch
-        for _, pilot in self.pilots_df.iterrows():
-            if pd.notna(pilot['current_assignment']):
-                assigned_mission = self.missions_df[
-                    self.missions_df['project_id'] == pilot['current_assignment']
-                ]
-                
-                if not assigned_mission.empty:
-                    mission = assigned_mission.iloc[0]
-                    if pilot['location'] != mission['location']:
-                        conflicts.append({
-                            'type': 'Location Mismatch',
-                            'severity': 'Medium',
-                            'description': f"Pilot {pilot['name']} in {pilot['location']} assigned to mission in {mission['location']}",
-                            'affected_entity': pilot['pilot_id'],
-                            'details': {
-                                'pilot': pilot['name'],
-                                'pilot_location': pilot['location'],
-                                'mission_location': mission['location'],
-                                'mission': pilot['current_assignment']
-                            }
-                        })
-        
-        # 4. Maintenance Issues
-        for _, drone in self.drones_df.iterrows():
-            if pd.notna(drone['current_assignment']) and self._is_date_valid(drone['maintenance_due']):
-                maint_date = drone['maintenance_due'].date()
-                
-                if maint_date <= today:
-                    conflicts.append({
-                        'type': 'Maintenance Required',
-                        'severity': 'High',
-                        'description': f"Drone {drone['drone_id']} needs maintenance but is assigned to {drone['current_assignment']}",
-                        'affected_entity': drone['drone_id'],
-                        'details': {
-                            'drone': drone['drone_id'],
-                            'model': drone['model'],
-                            'assignment': drone['current_assignment'],
-                            'maintenance_due': drone['maintenance_due'].strftime('%Y-%m-%d')
-                        }
-                    })
+        for pilot in assigned[assigned['location'] != assigned['location_m']].itertuples(index=False):
+            add(
+                'Location Mismatch',
+                'Medium',
+                f"Pilot {pilot.name} in {pilot.location} assigned to mission in {pilot.location_m}",
+                pilot.pilot_id,
+                {
+                    'pilot': pilot.name,
+                    'pilot_location': pilot.location,
+                    'mission_location': pilot.location_m,
+                    'mission': pilot.current_assignment
+                }
+            )
+        
+        # 4. Maintenance Issues (NaT due dates never compare as due)
+        due = self.drones_df['current_assignment'].notna().to_numpy() & (self._maint_due <= today_d)
+        for drone in self.drones_df[due].itertuples(index=False):
+            add(
+                'Maintenance Required',
+                'High',
+                f"Drone {drone.drone_id} needs maintenance but is assigned to {drone.current_assignment}",
+                drone.drone_id,
+                {
+                    'drone': drone.drone_id,
+                    'model': drone.model,
+                    'assignment': drone.current_assignment,
+                    'maintenance_due': drone.maintenance_due.strftime('%Y-%m-%d')
+                }
+            )
         
         # 5. Unavailable Pilot Assignments
-        for _, pilot in self.pilots_df.iterrows():
-            if pilot['status'] != 'Available' and pd.notna(pilot['current_assignment']):
-                conflicts.append({
-                    'type': 'Unavailable Assignment',
-                    'severity': 'High',
-                    'description': f"Pilot {pilot['name']} status is '{pilot['status']}' but assigned to {pilot['current_assignment']}",
-                    'affected_entity': pilot['pilot_id'],
-                    'details': {
-                        'pilot': pilot['name'],
-                        'status': pilot['status'],
-                        'assignment': pilot['current_assignment']
-                    }
-                })
+        unavailable = (self.pilots_df['status'] != 'Available') & self.pilots_df['current_assignment'].notna()
+        for pilot in self.pilots_df[unavailable].itertuples(index=False):
+            add(
+                'Unavailable Assignment',
+                'High',
+                f"Pilot {pilot.name} status is '{pilot.status}' but assigned to {pilot.current_assignment}",
+                pilot.pilot_id,
+                {
+                    'pilot': pilot.name,
+                    'status': pilot.status,
+                    'assignment': pilot.current_assignment
+                }
+            )
         
-        return conflicts
+        return pd.DataFrame(columns)
     
     def find_best_pilots(self, mission_id: str, top_n: int = 3) -> List[Dict]:
         """Find best available pilots for a mission"""
-        mission = self.missions_df[self.missions_df['project_id'] == mission_id]
+        mission = self._mission_by_id.get(mission_id)
         
-        if mission.empty:
+        if mission is None:
             return []
         
-        mission = mission.iloc[0]
-        available_pilots = self.pilots_df[self.pilots_df['status'] == 'Available'].copy()
+        available_idx = np.flatnonzero((self.pilots_df['status'] == 'Available').to_numpy())
         
-        if available_pilots.empty:
+        if len(available_idx) == 0:
             return []
         
-        # Score pilots
+        available_pilots = self.pilots_df.iloc[available_idx]
+        
+        # Score all available pilots at once
+        required_skills = np.array([s in mission.required_skills_list for s in self._all_skills], dtype=np.int32)
+        required_certs = np.array([c in mission.required_certs_list for c in self._all_certs], dtype=np.int32)
+        skill_matches = self._pilot_skill_matrix[available_idx] @ required_skills
+        cert_matches = self._pilot_cert_matrix[available_idx] @ required_certs
+        same_location = (available_pilots['location'] == mission.location).to_numpy()
+        
+        available_from = available_pilots['available_from']
+        if self._is_date_valid(mission.start_date):
+            dates_known = available_from.notna().to_numpy()
+            available_in_time = (available_from.dt.normalize() <= mission.start_date.normalize()).to_numpy()
+        else:
+            dates_known = available_in_time = np.zeros(len(available_idx), dtype=bool)
+        
+        score_array = skill_matches * 10 + cert_matches * 15 + same_location * 20 + available_in_time * 5
+        
+        # Pick the top N without sorting every pilot; ties keep roster order
+        n = len(score_array)
+        rank_keys = score_array * n + np.arange(n - 1, -1, -1)
+        top = np.argpartition(-rank_keys, top_n)[:top_n] if top_n < n else np.arange(n)
+        top = top[np.argsort(-rank_keys[top])]
+        
+        # Build result records for the winners only
         scores = []
-        for _, pilot in available_pilots.iterrows():
-            score = 0
+        for pilot, score, skill_match, cert_match, is_local, date_known, in_time in zip(
+            available_pilots.iloc[top].itertuples(index=False), score_array[top].tolist(),
+            skill_matches[top].tolist(), cert_matches[top].tolist(), same_location[top],
+            dates_known[top], available_in_time[top]
+        ):
             reasons = []
             
             # Skill match
-            skill_match = len(set(mission['required_skills_list']) & set(pilot['skills_list']))
-            score += skill_match * 10
-            if skill_match == len(mission['required_skills_list']):
+            if skill_match == len(mission.required_skills_list):
                 reasons.append("✅ All required skills")
             else:
-                reasons.append(f"⚠️ {skill_match}/{len(mission['required_skills_list'])} skills")
+                reasons.append(f"⚠️ {skill_match}/{len(mission.required_skills_list)} skills")
             
             # Certification match
-            cert_match = len(set(mission['required_certs_list']) & set(pilot['certs_list']))
-            score += cert_match * 15
-            if cert_match == len(mission['required_certs_list']):
+            if cert_match == len(mission.required_certs_list):
                 reasons.append("✅ All required certifications")
             else:
-                reasons.append(f"⚠️ {cert_match}/{len(mission['required_certs_list'])} certifications")
+                reasons.append(f"⚠️ {cert_match}/{len(mission.required_certs_list)} certifications")
             
             # Location match
-            if pilot['location'] == mission['location']:
-                score += 20
-                reasons.append(f"✅ Same location ({pilot['location']})")
+            if is_local:
+                reasons.append(f"✅ Same location ({pilot.location})")
             else:
-                reasons.append(f"⚠️ Different location (pilot in {pilot['location']}, mission in {mission['location']})")
+                reasons.append(f"⚠️ Different location (pilot in {pilot.location}, mission in {mission.location})")
             
             # Availability date
-            if self._is_date_valid(pilot['available_from']) and self._is_date_valid(mission['start_date']):
-                if pilot['available_from'].date() <= mission['start_date'].date():
-                    score += 5
+            if date_known:
+                if in_time:
                     reasons.append("✅ Available before mission start")
                 else:
                     reasons.append("⚠️ Not available until after mission start")
             
             scores.append({
-                'pilot_id': pilot['pilot_id'],
-                'name': pilot['name'],
+                'pilot_id': pilot.pilot_id,
+                'name': pilot.name,
                 'score': score,
-                'location': pilot['location'],
-                'skills': pilot['skills'],
-                'certifications': pilot['certifications'],
+                'location': pilot.location,
+                'skills': pilot.skills,
+                'certifications': pilot.certifications,
                 'reasons': reasons,
                 'is_perfect_match': score >= 50
             })
         
-        # Sort by score
-        scores.sort(key=lambda x: x['score'], reverse=True)
-        return scores[:top_n]
+        return scores
     
     def get_availability_summary(self) -> Dict:
         """Get summary of availability"""
-        today = datetime.now().date()
+        today = np.datetime64(date.today(), 'D')
         
         # Count active and upcoming missions (skip invalid dates)
-        active_missions = 0
-        upcoming_missions = 0
-        
-        for _, mission in self.missions_df.iterrows():
-            if self._is_date_valid(mission['start_date']) and self._is_date_valid(mission['end_date']):
-                start = mission['start_date'].date()
-                end = mission['end_date'].date()
-                
-                if start <= today <= end:
-                    active_missions += 1
-                elif start > today:
-                    upcoming_missions += 1
+        active_missions = int(np.count_nonzero(self._mission_dated & (self._start <= today) & (self._end >= today)))
+        upcoming_missions = int(np.count_nonzero(self._mission_dated & (self._start > today)))
+        
+        # One pass per column, then dictionary lookups
+        pilot_counts = self.pilots_df['status'].value_counts()
+        drone_counts = self.drones_df['status'].value_counts()
+        priority_counts = self.missions_df['priority'].value_counts()
         
         return {
             'pilots': {
                 'total': len(self.pilots_df),
-                'available': len(self.pilots_df[self.pilots_df['status'] == 'Available']),
-                'assigned': len(self.pilots_df[self.pilots_df['current_assignment'].notna()]),
-                'on_leave': len(self.pilots_df[self.pilots_df['status'] == 'On Leave'])
+                'available': int(pilot_counts.get('Available', 0)),
+                'assigned': int(self.pilots_df['current_assignment'].notna().sum()),
+                'on_leave': int(pilot_counts.get('On Leave', 0))
             },
             'drones': {
                 'total': len(self.drones_df),
-                'available': len(self.drones_df[self.drones_df['status'] == 'Available']),
-                'deployed': len(self.drones_df[self.drones_df['status'] == 'Deployed']),
-                'maintenance': len(self.drones_df[self.drones_df['status'] == 'Maintenance'])
+                'available': int(drone_counts.get('Available', 0)),
+                'deployed': int(drone_counts.get('Deployed', 0)),
+                'maintenance': int(drone_counts.get('Maintenance', 0))
             },
             'missions': {
                 'total': len(self.missions_df),
                 'active': active_missions,
                 'upcoming': upcoming_missions,
-                'urgent': len(self.missions_df[self.missions_df['priority'] == 'Urgent'])
+                'urgent': int(priority_counts.get('Urgent', 0))
             }
         }
     
     def assign_pilot(self, pilot_id: str, mission_id: str) -> Tuple[bool, str]:
         """Assign a pilot to a mission"""
-        pilot_idx = self.pilots_df[self.pilots_df['pilot_id'] == pilot_id].index
-        mission = self.missions_df[self.missions_df['project_id'] == mission_id]
+        pilot_idx = self._pilot_idx_by_id.get(pilot_id)
+        mission = self._mission_by_id.get(mission_id)
         
-        if pilot_idx.empty:
+        if pilot_idx is None:
             return False, f"Pilot {pilot_id} not found"
         
-        if mission.empty:
+        if mission is None:
             return False, f"Mission {mission_id} not found"
         
-        pilot_idx = pilot_idx[0]
-        mission = mission.iloc[0]
-        
         # Verify skills and certs
         pilot = self.pilots_df.loc[pilot_idx]
-        missing_skills = [s for s in mission['required_skills_list'] if s not in pilot['skills_list']]
-        missing_certs = [c for c in mission['required_certs_list'] if c not in pilot['certs_list']]
+        missing_skills = sorted(mission.required_skills_list - pilot['skills_list'])
+        missing_certs = sorted(mission.required_certs_list - pilot['certs_list'])
         
         if missing_skills or missing_certs:
             warnings = []
@@ -354,50 +507,52 @@ class DroneOpsAgent:
             return False, "; ".join(warnings)
         
         # Assign
+        self._ensure_mutable()
         self.pilots_df.loc[pilot_idx, 'status'] = 'Assigned'
         self.pilots_df.loc[pilot_idx, 'current_assignment'] = mission_id
         
-        if self._is_date_valid(mission['end_date']):
-            self.pilots_df.loc[pilot_idx, 'available_from'] = mission['end_date']
+        if self._is_date_valid(mission.end_date):
+            self.pilots_df.loc[pilot_idx, 'available_from'] = mission.end_date
+        self._data_version += 1
         
         return True, f"Successfully assigned {pilot['name']} to {mission_id}"
     
     def unassign_pilot(self, pilot_id: str) -> Tuple[bool, str]:
         """Unassign a pilot from their current mission"""
-        pilot_idx = self.pilots_df[self.pilots_df['pilot_id'] == pilot_id].index
+        pilot_idx = self._pilot_idx_by_id.get(pilot_id)
         
-        if pilot_idx.empty:
+        if pilot_idx is None:
             return False, f"Pilot {pilot_id} not found"
         
-        pilot_idx = pilot_idx[0]
         pilot = self.pilots_df.loc[pilot_idx]
         
         if pd.isna(pilot['current_assignment']):
             return False, f"Pilot {pilot['name']} is not currently assigned"
         
         old_assignment = pilot['current_assignment']
+        self._ensure_mutable()
         self.pilots_df.loc[pilot_idx, 'status'] = 'Available'
         self.pilots_df.loc[pilot_idx, 'current_assignment'] = None
         self.pilots_df.loc[pilot_idx, 'available_from'] = datetime.now()
+        self._data_version += 1
         
         return True, f"Successfully unassigned {pilot['name']} from {old_assignment}"
     
     def get_mission_status(self, mission_id: str) -> Optional[Dict]:
         """Get detailed status of a mission"""
-        mission = self.missions_df[self.missions_df['project_id'] == mission_id]
+        mission = self._mission_by_id.get(mission_id)
         
-        if mission.empty:
+        if mission is None:
             return None
         
-        mission = mission.iloc[0]
-        assigned_pilots = self.pilots_df[self.pilots_df['current_assignment'] == mission_id]
+        assigned_pilots = self.pilots_df.iloc[self._assignment_groups().get(mission_id, [])]
         
         today = datetime.now().date()
         
         status = "Unknown"
-        if self._is_date_valid(mission['start_date']) and self._is_date_valid(mission['end_date']):
-            start = mission['start_date'].date()
-            end = mission['end_date'].date()
+        if self._is_date_valid(mission.start_date) and self._is_date_valid(mission.end_date):
+            start = mission.start_date_d
+            end = mission.end_date_d
             
             if start <= today <= end:
                 status = "Active"
@@ -407,15 +562,15 @@ class DroneOpsAgent:
                 status = "Completed"
         
         return {
-            'project_id': mission['project_id'],
-            'client': mission['client'],
-            'location': mission['location'],
-            'start_date': mission['start_date'].strftime('%Y-%m-%d') if self._is_date_valid(mission['start_date']) else 'Invalid',
-            'end_date': mission['end_date'].strftime('%Y-%m-%d') if self._is_date_valid(mission['end_date']) else 'Invalid',
-            'priority': mission['priority'],
+            'project_id': mission.project_id,
+            'client': mission.client,
+            'location': mission.location,
+            'start_date': mission.start_date.strftime('%Y-%m-%d') if self._is_date_valid(mission.start_date) else 'Invalid',
+            'end_date': mission.end_date.strftime('%Y-%m-%d') if self._is_date_valid(mission.end_date) else 'Invalid',
+            'priority': mission.priority,
             'status': status,
-            'required_skills': mission['required_skills'],
-            'required_certs': mission['required_certs'],
+            'required_skills': mission.required_skills,
+            'required_certs': mission.required_certs,
             'assigned_pilots': assigned_pilots[['pilot_id', 'name', 'skills', 'certifications']].to_dict('records')
         }
 
@@ -429,26 +584,26 @@ class DroneOpsAgent:
         q = query.lower()
 
         # Explicit intents first
-        if any(k in q for k in ["conflict", "issue", "problem", "mismatch", "double book"]):
+        if _INTENT_PATTERNS["conflicts"].search(q):
             return self._respond_conflicts()
 
-        if any(k in q for k in ["urgent", "priority", "emergency"]):
+        if _INTENT_PATTERNS["urgent"].search(q):
             return self._respond_urgent_missions()
 
-        if any(k in q for k in ["available", "availability", "who is available", "free to fly"]):
+        if _INTENT_PATTERNS["availability"].search(q):
             return self._respond_availability()
 
-        if any(k in q for k in ["mission", "project", "client"]):
+        if _INTENT_PATTERNS["missions"].search(q):
             # Mission status / overview
             return self._respond_mission_overview(q)
 
-        if any(k in q for k in ["assign", "allocate", "schedule"]):
+        if _INTENT_PATTERNS["assignment"].search(q):
             return self._respond_assignment_intent(q)
 
-        if any(k in q for k in ["pilot", "roster"]):
+        if _INTENT_PATTERNS["pilots"].search(q):
             return self._respond_pilot_roster()
 
-        if any(k in q for k in ["drone", "fleet", "equipment"]):
+        if _INTENT_PATTERNS["drones"].search(q):
             return self._respond_drone_fleet()
 
         # Fallback help
@@ -469,11 +624,11 @@ class DroneOpsAgent:
     def _respond_availability(self) -> str:
         summary = self.get_availability_summary()
 
-        text = "📊 **Current Availability Overview**\n\n"
+        parts = ["📊 **Current Availability Overview**\n\n"]
 
         # Pilots
         p = summary["pilots"]
-        text += (
+        parts.append(
             f"👨‍✈️ **Pilots**\n"
             f"- Total: {p['total']}\n"
             f"- Available: {p['available']}\n"
@@ -483,7 +638,7 @@ class DroneOpsAgent:
 
         # Drones
         d = summary["drones"]
-        text += (
+        parts.append(
             f"🚁 **Drones**\n"
             f"- Total: {d['total']}\n"
             f"- Available: {d['available']}\n"
@@ -493,7 +648,7 @@ class DroneOpsAgent:
 
         # Missions
         m = summary["missions"]
-        text += (
+        parts.append(
             f"📋 **Missions**\n"
             f"- Total: {m['total']}\n"
             f"- Active: {m['active']}\n"
@@ -501,83 +656,90 @@ class DroneOpsAgent:
             f"- Urgent: {m['urgent']}\n"
         )
 
-        return text
+        return "".join(parts)
 
     def _respond_conflicts(self) -> str:
-        conflicts = self.detect_all_conflicts()
-        if not conflicts:
+        conflicts = self.detect_conflicts_frame()
+        if conflicts.empty:
             return "✅ **No conflicts detected.** All pilots, drones, and missions look consistent."
 
-        text = f"⚠️ **Detected {len(conflicts)} potential conflicts:**\n\n"
+        parts = [f"⚠️ **Detected {len(conflicts)} potential conflicts:**\n\n"]
 
-        for c in conflicts:
-            text += f"- **{c['type']}** ({c.get('severity', 'Unknown')}): {c.get('description', '')}\n"
-        text += "\n💡 Use the **Conflicts** tab for a structured, filterable view and suggestions."
-        return text
+        for conflict_type, severity, description in conflicts[["type", "severity", "description"]].itertuples(
+            index=False, name=None
+        ):
+            parts.append(f"- **{conflict_type}** ({severity}): {description}\n")
+        parts.append("\n💡 Use the **Conflicts** tab for a structured, filterable view and suggestions.")
+        return "".join(parts)
 
     def _respond_urgent_missions(self) -> str:
-        urgent = self.missions_df[self.missions_df["priority"] == "Urgent"]
+        urgent = self._urgent_missions
         if urgent.empty:
             return "✅ **No missions marked as Urgent right now.**"
 
-        text = f"🚨 **Urgent Missions & Suggested Reassignments ({len(urgent)})**\n\n"
+        parts = [f"🚨 **Urgent Missions & Suggested Reassignments ({len(urgent)})**\n\n"]
 
-        for _, mission in urgent.iterrows():
-            text += (
-                f"**{mission['project_id']} – {mission['client']}**  \n"
-                f"- Location: {mission['location']}  \n"
-                f"- Window: {mission['start_date'].date()} → {mission['end_date'].date()}  \n"
-                f"- Required: {mission['required_skills']} | Certs: {mission['required_certs']}\n"
+        urgent_cols = [
+            "project_id", "client", "location", "start_date_d", "end_date_d", "required_skills", "required_certs"
+        ]
+        for project_id, client, location, start_date, end_date, required_skills, required_certs in urgent[
+            urgent_cols
+        ].itertuples(index=False, name=None):
+            parts.append(
+                f"**{project_id} – {client}**  \n"
+                f"- Location: {location}  \n"
+                f"- Window: {start_date} → {end_date}  \n"
+                f"- Required: {required_skills} | Certs: {required_certs}\n"
             )
 
-            candidates = self.find_best_pilots(mission["project_id"], top_n=3)
+            candidates = self.find_best_pilots(project_id, top_n=3)
             if not candidates:
-                text += "  - ❌ No strong pilot matches available. Consider relaxing skill/location constraints.\n\n"
+                parts.append("  - ❌ No strong pilot matches available. Consider relaxing skill/location constraints.\n\n")
                 continue
 
-            text += "  - ✅ **Top Pilot Options:**\n"
+            parts.append("  - ✅ **Top Pilot Options:**\n")
             for c in candidates:
                 reasons = "; ".join(c["reasons"])
-                text += (
+                parts.append(
                     f"    - **{c['name']} ({c['pilot_id']})** – score {c['score']}  \n"
                     f"      {reasons}\n"
                 )
-            text += "\n"
+            parts.append("\n")
 
-        text += (
+        parts.append(
             "These are *recommendations only* – use the **Data Management** tab to commit any reassignments "
             "so they sync back to Google Sheets."
         )
-        return text
+        return "".join(parts)
 
     def _respond_mission_overview(self, q: str) -> str:
         # Try to extract an explicit mission ID like PRJ001
-        match = re.search(r"prj\\d+", q)
+        match = _MISSION_RE.search(q)
         if match:
             mission_id = match.group().upper()
             info = self.get_mission_status(mission_id)
             if not info:
                 return f"❌ Mission **{mission_id}** not found."
 
-            text = f"📋 **Mission {info['project_id']} – {info['client']}**\n\n"
-            text += (
+            parts = [
+                f"📋 **Mission {info['project_id']} – {info['client']}**\n\n",
                 f"- Location: {info['location']}\n"
                 f"- Window: {info['start_date']} → {info['end_date']}\n"
                 f"- Priority: {info['priority']}\n"
                 f"- Status: {info['status']}\n"
-                f"- Required: {info['required_skills']} | Certs: {info['required_certs']}\n\n"
-            )
+                f"- Required: {info['required_skills']} | Certs: {info['required_certs']}\n\n",
+            ]
 
             if info["assigned_pilots"]:
-                text += "**Assigned pilots:**\n"
+                parts.append("**Assigned pilots:**\n")
                 for p in info["assigned_pilots"]:
-                    text += (
+                    parts.append(
                         f"- {p['name']} ({p['pilot_id']}) – {p['skills']} | {p['certifications']}\n"
                     )
             else:
-                text += "❌ No pilots currently assigned.\n"
+                parts.append("❌ No pilots currently assigned.\n")
 
-            return text
+            return "".join(parts)
 
         # If no specific ID, return a short overview
         m = self.get_availability_summary()["missions"]
@@ -591,8 +753,8 @@ class DroneOpsAgent:
         )
 
     def _respond_assignment_intent(self, q: str) -> str:
-        pilot_match = re.search(r"p\\d+", q)
-        mission_match = re.search(r"prj\\d+", q)
+        pilot_match = _PILOT_RE.search(q)
+        mission_match = _MISSION_RE.search(q)
 
         if not (pilot_match and mission_match):
             return (
@@ -604,32 +766,27 @@ class DroneOpsAgent:
         mission_id = mission_match.group().upper()
 
         # Check feasibility without committing any write back
-        mission = self.missions_df[self.missions_df["project_id"] == mission_id]
-        pilot = self.pilots_df[self.pilots_df["pilot_id"] == pilot_id]
+        mission = self._mission_by_id.get(mission_id)
+        pilot_idx = self._pilot_idx_by_id.get(pilot_id)
 
-        if mission.empty:
+        if mission is None:
             return f"❌ Mission **{mission_id}** not found."
-        if pilot.empty:
+        if pilot_idx is None:
             return f"❌ Pilot **{pilot_id}** not found."
 
-        mission = mission.iloc[0]
-        pilot = pilot.iloc[0]
+        pilot = self.pilots_df.loc[pilot_idx]
 
-        missing_skills = [
-            s for s in mission["required_skills_list"] if s not in pilot["skills_list"]
-        ]
-        missing_certs = [
-            c for c in mission["required_certs_list"] if c not in pilot["certs_list"]
-        ]
+        missing_skills = sorted(mission.required_skills_list - pilot["skills_list"])
+        missing_certs = sorted(mission.required_certs_list - pilot["certs_list"])
 
         issues = []
         if missing_skills:
             issues.append(f"- Missing skills: {', '.join(missing_skills)}")
         if missing_certs:
             issues.append(f"- Missing certifications: {', '.join(missing_certs)}")
-        if pilot["location"] != mission["location"]:
+        if pilot["location"] != mission.location:
             issues.append(
-                f"- Location mismatch: pilot in {pilot['location']}, mission in {mission['location']}"
+                f"- Location mismatch: pilot in {pilot['location']}, mission in {mission.location}"
             )
         if pilot["status"] != "Available":
             msg = f"- Pilot status is {pilot['status']}"
@@ -644,54 +801,60 @@ class DroneOpsAgent:
                 "You can commit this via the **Data Management → Pilots** tab so it syncs back to Google Sheets."
             )
 
-        text = (
+        parts = [
             f"❌ **{pilot['name']} ({pilot_id}) is *not* an ideal fit for {mission_id}.**\n\n"
-            "Issues detected:\n" + "\n".join(issues)
-        )
+            "Issues detected:\n",
+            "\n".join(issues),
+        ]
         best = self.find_best_pilots(mission_id, top_n=3)
         if best:
-            text += "\n\n💡 **Alternative pilot suggestions:**\n"
+            parts.append("\n\n💡 **Alternative pilot suggestions:**\n")
             for c in best:
-                text += f"- {c['name']} ({c['pilot_id']}) – score {c['score']}\n"
-        return text
+                parts.append(f"- {c['name']} ({c['pilot_id']}) – score {c['score']}\n")
+        return "".join(parts)
 
     def _respond_pilot_roster(self) -> str:
         available = self.pilots_df[self.pilots_df["status"] == "Available"]
         if available.empty:
             return "👨‍✈️ **Pilot Roster**\n\nNo pilots are currently marked as Available."
 
-        text = "👨‍✈️ **Pilot Roster – Available Pilots**\n\n"
-        for _, p in available.iterrows():
-            text += (
-                f"- **{p['name']} ({p['pilot_id']})** – {p['skills']} | {p['certifications']}  \n"
-                f"  Location: {p['location']} | Status: {p['status']}\n"
+        parts = ["👨‍✈️ **Pilot Roster – Available Pilots**\n\n"]
+        roster_cols = ["name", "pilot_id", "skills", "certifications", "location", "status"]
+        for name, pilot_id, skills, certifications, location, status in available[roster_cols].itertuples(
+            index=False, name=None
+        ):
+            parts.append(
+                f"- **{name} ({pilot_id})** – {skills} | {certifications}  \n"
+                f"  Location: {location} | Status: {status}\n"
             )
-        return text
+        return "".join(parts)
 
     def _respond_drone_fleet(self) -> str:
         available = self.drones_df[self.drones_df["status"] == "Available"]
         maintenance = self.drones_df[self.drones_df["status"] == "Maintenance"]
 
-        text = "🚁 **Drone Fleet Overview**\n\n"
-        text += f"- Total drones: {len(self.drones_df)}\n"
-        text += f"- Available: {len(available)}\n"
-        text += f"- In maintenance: {len(maintenance)}\n\n"
+        parts = [
+            "🚁 **Drone Fleet Overview**\n\n"
+            f"- Total drones: {len(self.drones_df)}\n"
+            f"- Available: {len(available)}\n"
+            f"- In maintenance: {len(maintenance)}\n\n"
+        ]
 
         if not available.empty:
-            text += "**Available drones:**\n"
-            for _, d in available.iterrows():
-                text += (
-                    f"- {d['drone_id']} – {d['model']} ({d['capabilities']}) in {d['location']}\n"
+            parts.append("**Available drones:**\n")
+            for d in available[["drone_id", "model", "capabilities", "location"]].itertuples(index=False):
+                parts.append(
+                    f"- {d.drone_id} – {d.model} ({d.capabilities}) in {d.location}\n"
                 )
 
         if not maintenance.empty:
-            text += "\n🔧 **Maintenance queue:**\n"
-            for _, d in maintenance.iterrows():
+            parts.append("\n🔧 **Maintenance queue:**\n")
+            for d in maintenance[["drone_id", "model", "maintenance_due"]].itertuples(index=False):
                 due = (
-                    d["maintenance_due"].strftime("%Y-%m-%d")
-                    if self._is_date_valid(d["maintenance_due"])
+                    d.maintenance_due.strftime("%Y-%m-%d")
+                    if self._is_date_valid(d.maintenance_due)
                     else "Unknown"
                 )
-                text += f"- {d['drone_id']} – {d['model']} (due {due})\n"
+                parts.append(f"- {d.drone_id} – {d.model} (due {due})\n")
 
-        return text
\ No newline at end of file
+        return "".join(parts)
\ No newline at end of file
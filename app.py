@@ -1,10 +1,22 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import json
-from sheets_manager import SheetsManager
+from sheets_manager import get_sheets_manager
 from agent_logic import DroneOpsAgent
 import os
+from html import escape
+
+_PRIORITY_ICON = {'Urgent': '🔴', 'High': '🟠', 'Standard': '🟢'}
+
+# Chat quick actions: (button label, prompt sent to the agent, spinner text)
+_QUICK_ACTIONS = [
+    ("🔍 Check Availability", "Who is available for missions right now?", "🤔 Checking availability..."),
+    ("⚠️ Show Conflicts", "Show me all current conflicts and issues", "🔎 Scanning for conflicts..."),
+    ("🚨 Urgent Missions", "Are there any urgent missions that need attention?", "🚨 Analyzing urgent missions..."),
+    ("📍 Location Check", "Check for any location mismatches", "📍 Checking locations..."),
+]
 
 # Page configuration
 st.set_page_config(
@@ -68,17 +80,75 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Versions only move forward, so a handful of entries covers the live ones
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_conflicts(version, agent_version, _agent):
+    """Conflict list memoized per sheet data version and agent roster version"""
+    return _agent.detect_all_conflicts()
+
+def _conflict_table(conflict):
+    """Format one conflict dict as a compact two-column HTML table"""
+    rows = []
+    for key, value in conflict.items():
+        if isinstance(value, dict):
+            cell = "<br>".join(
+                f"{escape(str(k))}: {escape(', '.join(map(str, v)) if isinstance(v, list) else str(v))}"
+                for k, v in value.items()
+            )
+        else:
+            cell = escape(str(value))
+        rows.append(f"<tr><td><strong>{escape(str(key))}</strong></td><td>{cell}</td></tr>")
+    return f"<table>{''.join(rows)}</table>"
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _conflict_html(version, agent_version, _conflicts):
+    """HTML for each conflict, built once per data version"""
+    return [_conflict_table(c) for c in _conflicts]
+
+# Four charts per version; room for the live version and the one before it
+@st.cache_data(show_spinner=False, max_entries=8)
+def _counts(version, key, col, _df):
+    """value_counts of one column, memoized per data version and frame key"""
+    return _df[col].value_counts()
+
+def _add_message(role, content):
+    """Append a chat message to the session history"""
+    st.session_state.messages.append({"role": role, "content": content})
+
+def _ask_agent(prompt, spinner_text):
+    """Post a prompt to the chat, append the agent's answer and rerun"""
+    _add_message("user", prompt)
+    with st.spinner(spinner_text):
+        response = st.session_state.agent.process_query(prompt)
+        _add_message("assistant", response)
+    st.rerun()
+
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
+# Number of most recent chat messages rendered per rerun
+st.session_state.setdefault('chat_window', 50)
+
 if 'sheets_manager' not in st.session_state:
     try:
-        st.session_state.sheets_manager = SheetsManager()
-        st.session_state.agent = DroneOpsAgent(st.session_state.sheets_manager)
+        st.session_state.sheets_manager = get_sheets_manager()
     except Exception as e:
         st.error(f"⚠️ Failed to initialize Google Sheets connection: {str(e)}")
         st.stop()
+else:
+    # Writes patch the cached frames; edits made directly in the sheets land after the TTL
+    try:
+        st.session_state.sheets_manager.reload_if_stale()
+    except Exception as e:
+        # Keep serving the frames already loaded
+        st.warning(f"⚠️ Could not refresh from Google Sheets, showing cached data: {str(e)}")
+
+# The manager is shared by every session, so rebuild this session's agent
+# whenever its data has moved on (reloads or writes from any session)
+if st.session_state.get('agent_version') != st.session_state.sheets_manager._version:
+    st.session_state.agent = DroneOpsAgent(st.session_state.sheets_manager)
+    st.session_state.agent_version = st.session_state.sheets_manager._version
 
 if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
@@ -88,15 +158,18 @@ st.markdown('<div class="main-header">🚁 Skylark Drones Operations Coordinator
 st.markdown('<div class="sub-header">AI-Powered Drone Fleet & Pilot Management System</div>', unsafe_allow_html=True)
 
 # Sidebar
-with st.sidebar:
+@st.fragment
+def _sidebar():
+    """Status metrics; reruns on its own when only sidebar widgets change"""
     st.header("📊 System Status")
     
     if st.button("🔄 Refresh Data", use_container_width=True):
         with st.spinner("Syncing with Google Sheets..."):
-            st.session_state.sheets_manager.reload_data()
-            st.session_state.agent = DroneOpsAgent(st.session_state.sheets_manager)
+            st.session_state.sheets_manager.reload_data(update=True)
             st.session_state.data_loaded = True
-            st.success("✅ Data refreshed!")
+        st.toast("✅ Data refreshed!")
+        # Every view reads the reloaded data (and the agent is rebuilt), so refresh the whole page
+        st.rerun(scope="app")
     
     st.divider()
     
@@ -106,84 +179,66 @@ with st.sidebar:
         drones_df = st.session_state.sheets_manager.drones_df
         missions_df = st.session_state.sheets_manager.missions_df
         
+        # One pass per status column; metrics read from the counts
+        pilot_counts = pilots_df['status'].value_counts()
+        drone_counts = drones_df['status'].value_counts()
+        
         st.subheader("👨‍✈️ Pilots")
         st.metric("Total", len(pilots_df))
-        st.metric("Available", len(pilots_df[pilots_df['status'] == 'Available']))
-        st.metric("Assigned", len(pilots_df[pilots_df['status'] == 'Assigned']))
-        st.metric("On Leave", len(pilots_df[pilots_df['status'] == 'On Leave']))
+        st.metric("Available", int(pilot_counts.get('Available', 0)))
+        st.metric("Assigned", int(pilot_counts.get('Assigned', 0)))
+        st.metric("On Leave", int(pilot_counts.get('On Leave', 0)))
         
         st.divider()
         
         st.subheader("🚁 Drones")
         st.metric("Total", len(drones_df))
-        st.metric("Available", len(drones_df[drones_df['status'] == 'Available']))
-        st.metric("Deployed", len(drones_df[drones_df['status'] == 'Deployed']))
-        st.metric("Maintenance", len(drones_df[drones_df['status'] == 'Maintenance']))
+        st.metric("Available", int(drone_counts.get('Available', 0)))
+        st.metric("Deployed", int(drone_counts.get('Deployed', 0)))
+        st.metric("Maintenance", int(drone_counts.get('Maintenance', 0)))
         
         st.divider()
         
         st.subheader("📋 Missions")
-        today = datetime.now().date()
-        active_missions = missions_df[
-            (pd.to_datetime(missions_df['start_date']).dt.date <= today) &
-            (pd.to_datetime(missions_df['end_date']).dt.date >= today)
-        ]
-        urgent_missions = missions_df[missions_df['priority'] == 'Urgent']
+        today64 = pd.Timestamp(datetime.now().date())
+        active_mask = (missions_df['start_date'] <= today64) & (missions_df['end_date'] >= today64)
+        active_count = int(active_mask.sum())
+        urgent_count = int(missions_df['priority'].eq('Urgent').sum())
         
         st.metric("Total", len(missions_df))
-        st.metric("Active", len(active_missions))
-        st.metric("Urgent", len(urgent_missions))
+        st.metric("Active", active_count)
+        st.metric("Urgent", urgent_count)
         
         # Detect conflicts
-        conflicts = st.session_state.agent.detect_all_conflicts()
+        conflicts = _cached_conflicts(
+            st.session_state.sheets_manager._version,
+            st.session_state.agent._data_version,
+            st.session_state.agent
+        )
         if conflicts:
             st.divider()
             st.subheader("⚠️ Conflicts")
             st.metric("Total Issues", len(conflicts))
-            high_severity = len([c for c in conflicts if c.get('severity') == 'high'])
+            high_severity = len([c for c in conflicts if c.get('severity', '').lower() == 'high'])
             if high_severity > 0:
                 st.error(f"🔴 {high_severity} High Priority")
 
+with st.sidebar:
+    _sidebar()
+
 # Main content area
-tab1, tab2, tab3, tab4 = st.tabs(["💬 AI Assistant", "📊 Dashboard", "📋 Data View", "⚠️ Conflicts"])
+# A radio instead of st.tabs so only the visible view's data is computed each rerun
+VIEWS = ["💬 AI Assistant", "📊 Dashboard", "📋 Data View", "⚠️ Conflicts"]
+active_view = st.radio("View", VIEWS, horizontal=True, key="active_tab", label_visibility="collapsed")
 
-with tab1:
+if active_view == VIEWS[0]:
     st.header("Chat with AI Operations Coordinator")
     
     # Quick action buttons (send question + auto-run AI response)
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        if st.button("🔍 Check Availability", use_container_width=True):
-            prompt = "Who is available for missions right now?"
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.spinner("🤔 Checking availability..."):
-                response = st.session_state.agent.process_query(prompt)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
-    with col2:
-        if st.button("⚠️ Show Conflicts", use_container_width=True):
-            prompt = "Show me all current conflicts and issues"
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.spinner("🔎 Scanning for conflicts..."):
-                response = st.session_state.agent.process_query(prompt)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
-    with col3:
-        if st.button("🚨 Urgent Missions", use_container_width=True):
-            prompt = "Are there any urgent missions that need attention?"
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.spinner("🚨 Analyzing urgent missions..."):
-                response = st.session_state.agent.process_query(prompt)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
-    with col4:
-        if st.button("📍 Location Check", use_container_width=True):
-            prompt = "Check for any location mismatches"
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.spinner("📍 Checking locations..."):
-                response = st.session_state.agent.process_query(prompt)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
+    for (label, prompt, spinner_text), col in zip(_QUICK_ACTIONS, st.columns(len(_QUICK_ACTIONS))):
+        with col:
+            if st.button(label, use_container_width=True):
+                _ask_agent(prompt, spinner_text)
     
     st.divider()
     
@@ -191,8 +246,15 @@ with tab1:
     chat_container = st.container()
     
     with chat_container:
+        # Display only the latest chat_window messages; older ones load on demand
+        msgs = st.session_state.messages
+        start = max(0, len(msgs) - st.session_state.chat_window)
+        if start > 0 and st.button(f"⬆️ Load earlier messages ({start} hidden)"):
+            st.session_state.chat_window += 50
+            st.rerun()
+        
         # Display chat messages in a clean, chat-style layout
-        for message in st.session_state.messages:
+        for message in msgs[start:]:
             if message["role"] == "user":
                 with st.chat_message("user"):
                     st.markdown(message["content"])
@@ -205,104 +267,95 @@ with tab1:
     
     if user_input:
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        _add_message("user", user_input)
         
         # Get AI response
         with st.spinner("🤔 Thinking..."):
             response = st.session_state.agent.process_query(user_input)
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            _add_message("assistant", response)
         
         st.rerun()
 
-with tab2:
+elif active_view == VIEWS[1]:
     st.header("📊 Operations Dashboard")
     
     col1, col2 = st.columns(2)
     
+    manager = st.session_state.sheets_manager
+    
     with col1:
         st.subheader("👨‍✈️ Pilot Overview")
-        pilots_df = st.session_state.sheets_manager.pilots_df
         
         # Status distribution
-        status_counts = pilots_df['status'].value_counts()
-        st.bar_chart(status_counts)
+        st.bar_chart(_counts(manager._version, 'pilots', 'status', manager.pilots_df))
         
         # Location distribution
         st.subheader("📍 Pilots by Location")
-        location_counts = pilots_df['location'].value_counts()
-        st.bar_chart(location_counts)
+        st.bar_chart(_counts(manager._version, 'pilots', 'location', manager.pilots_df))
     
     with col2:
         st.subheader("🚁 Drone Fleet Status")
-        drones_df = st.session_state.sheets_manager.drones_df
         
         # Status distribution
-        drone_status = drones_df['status'].value_counts()
-        st.bar_chart(drone_status)
+        st.bar_chart(_counts(manager._version, 'drones', 'status', manager.drones_df))
         
         # Model distribution
         st.subheader("🔧 Fleet by Model")
-        model_counts = drones_df['model'].value_counts()
-        st.bar_chart(model_counts)
+        st.bar_chart(_counts(manager._version, 'drones', 'model', manager.drones_df))
     
     st.divider()
     
     # Upcoming missions timeline
     st.subheader("📅 Upcoming Missions")
     missions_df = st.session_state.sheets_manager.missions_df
-    upcoming = missions_df.copy()
-    upcoming['start_date'] = pd.to_datetime(upcoming['start_date'], errors='coerce')
-    upcoming = upcoming.sort_values('start_date')
+    upcoming = missions_df.sort_values('start_date').assign(
+        icon=lambda df: df['priority'].map(_PRIORITY_ICON).fillna('⚪'),
+        start_str=lambda df: df['start_date'].dt.strftime('%Y-%m-%d').fillna("Unknown"),
+        end_str=lambda df: df['end_date'].dt.strftime('%Y-%m-%d').fillna("Unknown")
+    )
     
-    for idx, mission in upcoming.iterrows():
-        priority_color = {
-            'Urgent': '🔴',
-            'High': '🟠',
-            'Standard': '🟢'
-        }.get(mission['priority'], '⚪')
-
-        start_val = mission['start_date']
-        if pd.notna(start_val):
-            start_str = start_val.strftime('%Y-%m-%d')
-        else:
-            start_str = "Unknown"
-        
-        st.markdown(f"""
-        **{priority_color} {mission['project_id']}** - {mission['client']}  
-        📍 {mission['location']} | 📅 {start_str} to {mission['end_date']}  
-        🎯 Required: {mission['required_skills']} | 📜 Certs: {mission['required_certs']}
-        """)
-        st.divider()
+    st.dataframe(
+        upcoming[[
+            'icon', 'project_id', 'client', 'location', 'start_str', 'end_str',
+            'required_skills', 'required_certs'
+        ]].rename(columns={
+            'icon': 'Priority', 'project_id': 'Project', 'client': 'Client', 'location': '📍 Location',
+            'start_str': '📅 Start', 'end_str': 'End',
+            'required_skills': '🎯 Required', 'required_certs': '📜 Certs'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
 
-with tab3:
+elif active_view == VIEWS[2]:
     st.header("📋 Data Management")
     
     view_tab1, view_tab2, view_tab3 = st.tabs(["Pilots", "Drones", "Missions"])
     
     with view_tab1:
         st.subheader("👨‍✈️ Pilot Roster")
-        pilots_df = st.session_state.sheets_manager.pilots_df
+        # Frame and search text from one snapshot; other sessions may write meanwhile
+        pilot_view = st.session_state.sheets_manager.pilot_view
+        pilots_df = pilot_view.df
         
         # Filters
         col1, col2, col3 = st.columns(3)
         with col1:
-            status_filter = st.multiselect("Filter by Status", pilots_df['status'].unique(), default=None)
+            status_filter = st.multiselect("Filter by Status", st.session_state.sheets_manager.pilot_statuses, default=None)
         with col2:
-            location_filter = st.multiselect("Filter by Location", pilots_df['location'].unique(), default=None)
+            location_filter = st.multiselect("Filter by Location", st.session_state.sheets_manager.pilot_locations, default=None)
         with col3:
             search = st.text_input("Search by name or skills")
         
-        # Apply filters
-        filtered_df = pilots_df.copy()
+        # Apply filters as one combined mask
+        mask = np.ones(len(pilots_df), dtype=bool)
         if status_filter:
-            filtered_df = filtered_df[filtered_df['status'].isin(status_filter)]
+            mask &= pilots_df['status'].isin(status_filter).to_numpy()
         if location_filter:
-            filtered_df = filtered_df[filtered_df['location'].isin(location_filter)]
+            mask &= pilots_df['location'].isin(location_filter).to_numpy()
         if search:
-            filtered_df = filtered_df[
-                filtered_df['name'].str.contains(search, case=False, na=False) |
-                filtered_df['skills'].str.contains(search, case=False, na=False)
-            ]
+            mask &= pilot_view.search_blob.str.contains(search.lower(), regex=False, na=False).to_numpy()
+        filtered_df = pilots_df[mask]
         
         st.dataframe(filtered_df, use_container_width=True, hide_index=True)
         
@@ -310,7 +363,7 @@ with tab3:
         st.subheader("⚡ Quick Status Update")
         col1, col2, col3 = st.columns(3)
         with col1:
-            pilot_to_update = st.selectbox("Select Pilot", pilots_df['pilot_id'].tolist())
+            pilot_to_update = st.selectbox("Select Pilot", st.session_state.sheets_manager.pilot_ids)
         with col2:
             new_status = st.selectbox("New Status", ['Available', 'Assigned', 'On Leave'])
         with col3:
@@ -366,7 +419,7 @@ with tab3:
                     st.error("❌ Failed to add pilot")
 
         st.subheader("🗑️ Delete Pilot")
-        del_pilot_id = st.selectbox("Select Pilot to Delete", pilots_df["pilot_id"].tolist())
+        del_pilot_id = st.selectbox("Select Pilot to Delete", st.session_state.sheets_manager.pilot_ids)
         if st.button("Delete Pilot", use_container_width=True):
             confirm = st.checkbox("Confirm delete this pilot (cannot be undone)", value=False, key="confirm_delete_pilot")
             if not confirm:
@@ -388,7 +441,7 @@ with tab3:
         st.subheader("⚡ Quick Status Update")
         col1, col2, col3 = st.columns(3)
         with col1:
-            drone_to_update = st.selectbox("Select Drone", drones_df['drone_id'].tolist())
+            drone_to_update = st.selectbox("Select Drone", st.session_state.sheets_manager.drone_ids)
         with col2:
             new_drone_status = st.selectbox("New Status", ['Available', 'Deployed', 'Maintenance'])
         with col3:
@@ -444,7 +497,7 @@ with tab3:
                     st.error("❌ Failed to add drone")
 
         st.subheader("🗑️ Delete Drone")
-        del_drone_id = st.selectbox("Select Drone to Delete", drones_df["drone_id"].tolist())
+        del_drone_id = st.selectbox("Select Drone to Delete", st.session_state.sheets_manager.drone_ids)
         if st.button("Delete Drone", use_container_width=True):
             confirm_d = st.checkbox("Confirm delete this drone (cannot be undone)", value=False, key="confirm_delete_drone")
             if not confirm_d:
@@ -506,7 +559,7 @@ with tab3:
                     st.error("❌ Failed to add mission")
 
         st.subheader("🗑️ Delete Mission")
-        del_proj_id = st.selectbox("Select Mission to Delete", missions_df["project_id"].tolist())
+        del_proj_id = st.selectbox("Select Mission to Delete", st.session_state.sheets_manager.mission_ids)
         if st.button("Delete Mission", use_container_width=True):
             confirm_m = st.checkbox("Confirm delete this mission (cannot be undone)", value=False, key="confirm_delete_mission")
             if not confirm_m:
@@ -519,28 +572,36 @@ with tab3:
                 else:
                     st.error("❌ Failed to delete mission")
 
-with tab4:
+elif active_view == VIEWS[3]:
     st.header("⚠️ Conflict Detection & Resolution")
     
-    conflicts = st.session_state.agent.detect_all_conflicts()
+    conflicts = _cached_conflicts(
+        st.session_state.sheets_manager._version,
+        st.session_state.agent._data_version,
+        st.session_state.agent
+    )
     
     if not conflicts:
         st.success("✅ No conflicts detected! All systems operational.")
     else:
         st.error(f"🚨 {len(conflicts)} conflicts detected")
         
+        rendered = list(zip(conflicts, _conflict_html(
+            st.session_state.sheets_manager._version,
+            st.session_state.agent._data_version,
+            conflicts
+        )))
+        
         # Group by severity
-        high_severity = [c for c in conflicts if c.get('severity') == 'high']
-        medium_severity = [c for c in conflicts if c.get('severity') == 'medium']
-        low_severity = [c for c in conflicts if c.get('severity') == 'low']
+        high_severity = [(c, html) for c, html in rendered if c.get('severity', '').lower() == 'high']
+        medium_severity = [(c, html) for c, html in rendered if c.get('severity', '').lower() == 'medium']
+        low_severity = [(c, html) for c, html in rendered if c.get('severity', '').lower() == 'low']
         
         if high_severity:
             st.subheader("🔴 High Severity Issues")
-            for conflict in high_severity:
+            for conflict, html in high_severity:
                 with st.expander(f"{conflict['type'].replace('_', ' ').title()}", expanded=True):
-                    st.markdown(f'<div class="conflict-card">', unsafe_allow_html=True)
-                    st.json(conflict)
-                    st.markdown('</div>', unsafe_allow_html=True)
+                    st.markdown(f'<div class="conflict-card">{html}</div>', unsafe_allow_html=True)
                     
                     if conflict['type'] == 'skill_mismatch':
                         st.info(f"💡 **Suggestion**: Find alternative pilots with required skills: {', '.join(conflict.get('missing_skills', []))}")
@@ -549,15 +610,15 @@ with tab4:
         
         if medium_severity:
             st.subheader("🟡 Medium Severity Issues")
-            for conflict in medium_severity:
+            for conflict, html in medium_severity:
                 with st.expander(f"{conflict['type'].replace('_', ' ').title()}"):
-                    st.json(conflict)
+                    st.markdown(html, unsafe_allow_html=True)
         
         if low_severity:
             st.subheader("🟢 Low Severity Issues")
-            for conflict in low_severity:
+            for conflict, html in low_severity:
                 with st.expander(f"{conflict['type'].replace('_', ' ').title()}"):
-                    st.json(conflict)
+                    st.markdown(html, unsafe_allow_html=True)
 
 # Footer
 st.divider()
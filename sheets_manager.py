@@ -1,8 +1,58 @@
 import streamlit as st
 import gspread
+from gspread.utils import rowcol_to_a1
 import pandas as pd
+import numpy as np
+import re
 from google.oauth2.service_account import Credentials
 from datetime import datetime
+import time
+import threading
+import random
+from functools import wraps
+from collections import Counter, namedtuple
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_read(sources, _manager):
+    """Raw frames for (sheet_id, tab) sources, shared across reruns and sessions for a minute"""
+    # The three spreadsheets are independent, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        return list(pool.map(lambda source: _manager._read_sheet(*source), sources))
+
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+_RETRY_STATUSES = (429, 500, 503)
+
+
+def _retry(fn, *args, max_tries=6, retry_statuses=_RETRY_STATUSES, **kwargs):
+    """Call fn, backing off exponentially (with jitter) on retryable Sheets API errors"""
+    delay = 1.0
+    for attempt in range(max_tries):
+        try:
+            return fn(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status not in retry_statuses or attempt == max_tries - 1:
+                raise
+            time.sleep(delay + random.random())
+            delay *= 2
+
+
+# Pilot frame with its search text, published together so a reader never
+# pairs one load's frame with another's blob
+PilotView = namedtuple("PilotView", ["df", "search_blob"])
+
+
+def _synchronized(method):
+    """Run a SheetsManager method under the manager's lock"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class SheetsManager:
@@ -15,11 +65,39 @@ class SheetsManager:
 
     SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
+    # Shared across instances so versions stay unique within the process; they
+    # key st.cache_data entries, which are shared between sessions
+    _version_counter = count(1)
+
+    # Worksheet tab -> cached frame attribute and its date columns
+    _FRAMES = {
+        "pilot_roster.csv": ("pilots_df", ("available_from",)),
+        "drone_fleet.csv": ("drones_df", ("maintenance_due",)),
+        "missions.csv": ("missions_df", ("start_date", "end_date")),
+    }
+
+    # Worksheet tab -> attribute holding its ID-to-row index; looked up under
+    # the lock since every write replaces the index
+    _ROW_INDEXES = {
+        "pilot_roster.csv": "_pilot_row_index",
+        "drone_fleet.csv": "_drone_row_index",
+        "missions.csv": "_mission_row_index",
+    }
+
     def __init__(self):
         self.client = self._get_client()
         self.pilots_df = None
         self.drones_df = None
         self.missions_df = None
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._version = 0
+        self._cache_ts = 0.0
+        self.api_call_count = Counter()
+        self._count_lock = threading.Lock()
+        # One manager serves every session, so reads of the cached frames and
+        # row indexes, the API write and the patch must not interleave
+        self._lock = threading.RLock()
         self.reload_data()
 
     # ---------------- AUTH ----------------
@@ -40,100 +118,277 @@ class SheetsManager:
 
     # ---------------- READ ----------------
 
-    def reload_data(self):
-        self.pilots_df = self._read_sheet(self.PILOT_SHEET_ID, "pilot_roster.csv")
-        self.drones_df = self._read_sheet(self.DRONE_SHEET_ID, "drone_fleet.csv")
-        self.missions_df = self._read_sheet(self.MISSION_SHEET_ID, "missions.csv")
+    @_synchronized
+    def reload_data(self, update=False):
+        """Load all sheets, served from the shared read cache unless update=True"""
+        if update:
+            _cached_read.clear()
+        sources = (
+            (self.PILOT_SHEET_ID, "pilot_roster.csv"),
+            (self.DRONE_SHEET_ID, "drone_fleet.csv"),
+            (self.MISSION_SHEET_ID, "missions.csv"),
+        )
+        frames = _cached_read(sources, self)
+        # Parsed before publishing, since other sessions read these frames unlocked
+        for df, (_, date_cols) in zip(frames, self._FRAMES.values()):
+            self._parse_dates(df, *date_cols)
+        self.pilots_df, self.drones_df, self.missions_df = frames
+        self._cache_ts = time.time()
+        self._refresh_views()
+
+    def reload_if_stale(self, ttl=60):
+        """Reload from Sheets when the cached frames are older than ttl seconds"""
+        # Checked before taking the lock, which a write may hold through its
+        # retry backoff; fresh data is the common case on every rerun
+        if time.time() - self._cache_ts <= ttl:
+            return False
+        with self._lock:
+            # Another session may have reloaded while this one waited
+            if time.time() - self._cache_ts <= ttl:
+                return False
+            self.reload_data()
+            return True
+
+    def _refresh_views(self):
+        """Rebuild lookups derived from the cached frames and bump the data version"""
+        # Widget option lists, rebuilt only when the data changes
+        self.pilot_ids = self.pilots_df["pilot_id"].tolist()
+        self.drone_ids = self.drones_df["drone_id"].tolist()
+        self.mission_ids = self.missions_df["project_id"].tolist()
+        self.pilot_statuses = self.pilots_df["status"].unique().tolist()
+        self.pilot_locations = self.pilots_df["location"].unique().tolist()
+        # Pilot row positions per current assignment; seeds the agent's lookup
+        self.pilots_by_assignment = self.pilots_df.groupby("current_assignment").indices
+        # Lowercased name + skills, aligned with pilots_df, for single-pass search
+        self.pilot_view = PilotView(self.pilots_df, (
+            self.pilots_df["name"].fillna("").astype(str).str.lower() + "\n" +
+            self.pilots_df["skills"].fillna("").astype(str).str.lower()
+        ))
+        # Available row positions, also grouped by location, and lowercase token
+        # sets behind get_available_*
+        self._avail_pilot_rows, self._avail_pilots_by_location = self._positions_by(
+            self.pilots_df, self.pilots_df["status"] == "Available", "location"
+        )
+        self._avail_drone_rows, self._avail_drones_by_location = self._positions_by(
+            self.drones_df, self.drones_df["status"] == "Available", "location"
+        )
+        self._pilot_skill_sets = self._token_sets(self.pilots_df["skills"])
+        self._pilot_cert_sets = self._token_sets(self.pilots_df["certifications"])
+        self._drone_capability_sets = self._token_sets(self.drones_df["capabilities"])
+        # Sheet row number per ID so writes can skip a full-sheet read
+        self._pilot_row_index = self._row_index(self.pilots_df, "pilot_id")
+        self._drone_row_index = self._row_index(self.drones_df, "drone_id")
+        self._mission_row_index = self._row_index(self.missions_df, "project_id")
+        # Reloads and in-memory patches both land here, so this covers all writes
+        self._version = next(self._version_counter)
+
+    @staticmethod
+    def _token_sets(column):
+        """Comma/semicolon-separated cells as lowercase token sets"""
+        return [
+            frozenset(t.strip() for t in re.split(r"[,;]", raw.lower()) if t.strip())
+            for raw in column.fillna("").astype(str)
+        ]
+
+    @staticmethod
+    def _positions_by(df, mask, col):
+        """Row positions where mask holds, plus those positions grouped by col"""
+        rows = np.flatnonzero(mask.to_numpy())
+        groups = df.iloc[rows].groupby(col).indices
+        return rows, {key: rows[idx] for key, idx in groups.items()}
+
+    @staticmethod
+    def _with_token(rows, sets, token):
+        """Subset of row positions whose token set contains token"""
+        token = token.strip().lower()
+        return rows[np.fromiter((token in sets[i] for i in rows), dtype=bool, count=len(rows))]
+
+    @staticmethod
+    def _row_index(df, key_col):
+        """Map each ID (as sheet text) to its 1-based sheet row, first match winning"""
+        keys = df[key_col].astype(str).tolist()
+        # Built back to front so the first row of a duplicated ID overwrites later ones
+        return dict(zip(reversed(keys), range(len(keys) + 1, 1, -1)))
+
+    @staticmethod
+    def _live_row(keys, row_index, key_val):
+        """
+        Sheet row for key_val, checked against a live read of the key column.
+        The cached index is used when the sheet still has the key there;
+        otherwise the first live match. Also returns whether the cached row held.
+        """
+        key_val = str(key_val)
+        row = row_index.get(key_val)
+        if row is not None and row <= len(keys) and keys[row - 1] == key_val:
+            return row, True
+        if key_val not in keys[1:]:
+            return None, False
+        return keys.index(key_val, 1) + 1, False
+
+    def _patch_row(self, tab_name, row, updates):
+        """Mirror a successful cell write into the cached frame instead of reloading"""
+        _cached_read.clear()
+        frame_attr, date_cols = self._FRAMES[tab_name]
+        # Patch a copy and swap it in, as appends and deletes do; other
+        # sessions may be rendering the current frame
+        df = getattr(self, frame_attr).copy()
+        for col, value in updates.items():
+            if col in date_cols:
+                value = pd.to_datetime(value, errors="coerce")
+            df.iloc[row - 2, df.columns.get_loc(col)] = value
+        setattr(self, frame_attr, df)
+        self._refresh_views()
+
+    @staticmethod
+    def _parse_dates(df, *columns):
+        """Convert date columns once per load; unparseable cells become NaT"""
+        for col in columns:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    def _spreadsheet(self, sheet_id):
+        """Open each spreadsheet once and reuse the handle"""
+        if sheet_id not in self._spreadsheets:
+            self._spreadsheets[sheet_id] = self._api(self.client.open_by_key, sheet_id)
+        return self._spreadsheets[sheet_id]
+
+    def _worksheet(self, sheet_id, tab_name):
+        """Worksheet handle, looked up once per tab instead of on every write"""
+        key = (sheet_id, tab_name)
+        if key not in self._worksheets:
+            self._worksheets[key] = self._api(self._spreadsheet(sheet_id).worksheet, tab_name)
+        return self._worksheets[key]
+
+    def _api(self, fn, *args, **kwargs):
+        """Count a Sheets API call by method name and run it with retry/backoff"""
+        with self._count_lock:
+            self.api_call_count[fn.__name__] += 1
+        return _retry(fn, *args, **kwargs)
+
+    def _reopen(self):
+        """Drop cached handles and re-authenticate, e.g. after the token is rejected"""
+        self._spreadsheets.clear()
+        self._worksheets.clear()
+        self.client = self._get_client()
+
+    def _reopen_if_unauthorized(self, error):
+        """Reset handles when an API error is a 401 so the next call starts fresh"""
+        response = getattr(error, "response", None)
+        if getattr(response, "status_code", None) == 401:
+            self._reopen()
 
     def _read_sheet(self, sheet_id, tab_name):
+        spreadsheet = self._spreadsheet(sheet_id)
         try:
-            sheet = self.client.open_by_key(sheet_id).worksheet(tab_name)
-            return pd.DataFrame(sheet.get_all_records())
+            response = self._api(spreadsheet.values_batch_get, [f"'{tab_name}'"])
+            values = response["valueRanges"][0].get("values", [])
         except Exception:
-            spreadsheet = self.client.open_by_key(sheet_id)
-            sheets = spreadsheet.worksheets()
-
-            if len(sheets) == 1:
-                return pd.DataFrame(sheets[0].get_all_records())
-
-            raise RuntimeError(
-                f"Worksheet '{tab_name}' not found. "
-                f"Available sheets: {[s.title for s in sheets]}"
-            )
+            sheets = self._api(spreadsheet.worksheets)
+
+            if len(sheets) != 1:
+                raise RuntimeError(
+                    f"Worksheet '{tab_name}' not found. "
+                    f"Available sheets: {[s.title for s in sheets]}"
+                )
+            values = self._api(sheets[0].get_all_values)
+
+        return self._values_to_frame(values)
+
+    @staticmethod
+    def _values_to_frame(values):
+        """Header row + data rows to a DataFrame, padding rows the API trimmed"""
+        if not values:
+            return pd.DataFrame()
+        headers = values[0]
+        width = len(headers)
+        rows = [(row + [""] * (width - len(row)))[:width] for row in values[1:]]
+        return pd.DataFrame(rows, columns=headers)
 
     # ---------------- UPDATE STATUS ----------------
 
     def update_pilot_status(self, pilot_id, new_status,
                             current_assignment=None, available_from=None):
-        try:
-            sheet = self.client.open_by_key(self.PILOT_SHEET_ID).worksheet("pilot_roster.csv")
-            values = sheet.get_all_values()
-            headers = values[0]
-
-            pid_col = headers.index("pilot_id")
-            status_col = headers.index("status")
-            assign_col = headers.index("current_assignment")
-            avail_col = headers.index("available_from")
-
-            for idx, row in enumerate(values[1:], start=2):
-                if row[pid_col] == pilot_id:
-                    sheet.update_cell(idx, status_col + 1, new_status)
-                    if current_assignment is not None:
-                        sheet.update_cell(idx, assign_col + 1, current_assignment)
-                    if available_from is not None:
-                        sheet.update_cell(idx, avail_col + 1, available_from)
-                    self.reload_data()
-                    return True
-            return False
-        except Exception as e:
-            print("Pilot update failed:", e)
-            return False
+        updates = {"status": new_status}
+        if current_assignment is not None:
+            updates["current_assignment"] = current_assignment
+        if available_from is not None:
+            updates["available_from"] = available_from
+        return self._update_row(self.PILOT_SHEET_ID, "pilot_roster.csv", "pilot_id", pilot_id,
+                                updates, "Pilot update failed:")
 
     def update_drone_status(self, drone_id, new_status, current_assignment=None):
-        try:
-            sheet = self.client.open_by_key(self.DRONE_SHEET_ID).worksheet("drone_fleet.csv")
-            values = sheet.get_all_values()
-            headers = values[0]
-
-            did_col = headers.index("drone_id")
-            status_col = headers.index("status")
-            assign_col = headers.index("current_assignment")
-
-            for idx, row in enumerate(values[1:], start=2):
-                if row[did_col] == drone_id:
-                    sheet.update_cell(idx, status_col + 1, new_status)
-                    if current_assignment is not None:
-                        sheet.update_cell(idx, assign_col + 1, current_assignment)
-                    self.reload_data()
-                    return True
+        updates = {"status": new_status}
+        if current_assignment is not None:
+            updates["current_assignment"] = current_assignment
+        return self._update_row(self.DRONE_SHEET_ID, "drone_fleet.csv", "drone_id", drone_id,
+                                updates, "Drone update failed:")
+
+    def update_mission(self, project_id, updates):
+        """Update several mission fields at once; columns not in the sheet are ignored"""
+        updates = {col: value for col, value in updates.items() if col in self.missions_df.columns}
+        if not updates:
             return False
+        return self._update_row(self.MISSION_SHEET_ID, "missions.csv", "project_id", project_id,
+                                updates, "Mission update failed:")
+
+    @_synchronized
+    def _update_row(self, sheet_id, tab_name, key_col, key_val, updates, error_label):
+        """
+        Send the changed cells of one row as a single batch_update and patch
+        the cached frame only once Sheets has accepted them.
+        """
+        try:
+            sheet = self._worksheet(sheet_id, tab_name)
+            frame_attr, _ = self._FRAMES[tab_name]
+            headers = list(getattr(self, frame_attr).columns)
+
+            # People edit the sheets directly, so confirm the cached row still
+            # holds this key before writing to it
+            keys = self._api(sheet.col_values, headers.index(key_col) + 1)
+            row_index = getattr(self, self._ROW_INDEXES[tab_name])
+            idx, cached = self._live_row(keys, row_index, key_val)
+            if idx is None:
+                return False
+
+            self._api(sheet.batch_update, [
+                {"range": rowcol_to_a1(idx, headers.index(col) + 1), "values": [[value]]}
+                for col, value in updates.items()
+            ], value_input_option="USER_ENTERED")
+            if cached:
+                self._patch_row(tab_name, idx, updates)
+            else:
+                self.reload_data(update=True)
+            return True
         except Exception as e:
-            print("Drone update failed:", e)
+            self._reopen_if_unauthorized(e)
+            print(error_label, e)
             return False
 
     # ---------------- QUERY ----------------
 
     def get_available_pilots(self, skill=None, location=None, certification=None):
-        df = self.pilots_df[self.pilots_df["status"] == "Available"].copy()
+        if location:
+            rows = self._avail_pilots_by_location.get(location, self._avail_pilot_rows[:0])
+        else:
+            rows = self._avail_pilot_rows
 
         if skill:
-            df = df[df["skills"].str.contains(skill, case=False, na=False)]
-        if location:
-            df = df[df["location"] == location]
+            rows = self._with_token(rows, self._pilot_skill_sets, skill)
         if certification:
-            df = df[df["certifications"].str.contains(certification, case=False, na=False)]
+            rows = self._with_token(rows, self._pilot_cert_sets, certification)
 
-        return df
+        return self.pilots_df.iloc[rows]
 
     def get_available_drones(self, capability=None, location=None):
-        df = self.drones_df[self.drones_df["status"] == "Available"].copy()
+        if location:
+            rows = self._avail_drones_by_location.get(location, self._avail_drone_rows[:0])
+        else:
+            rows = self._avail_drone_rows
 
         if capability:
-            df = df[df["capabilities"].str.contains(capability, case=False, na=False)]
-        if location:
-            df = df[df["location"] == location]
+            rows = self._with_token(rows, self._drone_capability_sets, capability)
 
-        return df
+        return self.drones_df.iloc[rows]
 
     # ---------------- ASSIGN / UNASSIGN ----------------
 
@@ -156,23 +411,45 @@ class SheetsManager:
     # ---------------- CREATE ----------------
 
     def add_pilot(self, pilot_data):
-        return self._append_row(self.PILOT_SHEET_ID, "pilot_roster.csv", pilot_data)
+        return self._append_rows(self.PILOT_SHEET_ID, "pilot_roster.csv", [pilot_data])
 
     def add_drone(self, drone_data):
-        return self._append_row(self.DRONE_SHEET_ID, "drone_fleet.csv", drone_data)
+        return self._append_rows(self.DRONE_SHEET_ID, "drone_fleet.csv", [drone_data])
 
     def add_mission(self, mission_data):
-        return self._append_row(self.MISSION_SHEET_ID, "missions.csv", mission_data)
+        return self._append_rows(self.MISSION_SHEET_ID, "missions.csv", [mission_data])
 
-    def _append_row(self, sheet_id, tab_name, data):
+    def add_pilots_bulk(self, pilots_data):
+        return self._append_rows(self.PILOT_SHEET_ID, "pilot_roster.csv", pilots_data)
+
+    def add_drones_bulk(self, drones_data):
+        return self._append_rows(self.DRONE_SHEET_ID, "drone_fleet.csv", drones_data)
+
+    def add_missions_bulk(self, missions_data):
+        return self._append_rows(self.MISSION_SHEET_ID, "missions.csv", missions_data)
+
+    @_synchronized
+    def _append_rows(self, sheet_id, tab_name, data_list):
+        """Append any number of records with a single append_rows request"""
+        if not data_list:
+            return True
         try:
-            sheet = self.client.open_by_key(sheet_id).worksheet(tab_name)
-            headers = sheet.row_values(1)
-            row = [str(data.get(col, "")) for col in headers]
-            sheet.append_row(row)
-            self.reload_data()
+            sheet = self._worksheet(sheet_id, tab_name)
+            frame_attr, date_cols = self._FRAMES[tab_name]
+            # The cached frame carries the sheet's header order; only an empty sheet needs a read
+            headers = getattr(self, frame_attr).columns.tolist() or self._api(sheet.row_values, 1)
+            rows = [[str(data.get(col, "")) for col in headers] for data in data_list]
+            # Only retry rejected (429) appends; a 5xx may already have written the rows
+            self._api(sheet.append_rows, rows, value_input_option="RAW", retry_statuses=(429,))
+
+            new_rows = pd.DataFrame(rows, columns=headers)
+            self._parse_dates(new_rows, *date_cols)
+            setattr(self, frame_attr, pd.concat([getattr(self, frame_attr), new_rows], ignore_index=True))
+            _cached_read.clear()
+            self._refresh_views()
             return True
         except Exception as e:
+            self._reopen_if_unauthorized(e)
             print("Append failed:", e)
             return False
 
@@ -187,19 +464,66 @@ class SheetsManager:
     def delete_mission(self, project_id):
         return self._delete_row(self.MISSION_SHEET_ID, "missions.csv", "project_id", project_id)
 
+    def bulk_delete_pilots(self, pilot_ids):
+        return self._delete_rows(self.PILOT_SHEET_ID, "pilot_roster.csv", "pilot_id", pilot_ids)
+
+    def bulk_delete_drones(self, drone_ids):
+        return self._delete_rows(self.DRONE_SHEET_ID, "drone_fleet.csv", "drone_id", drone_ids)
+
+    def bulk_delete_missions(self, project_ids):
+        return self._delete_rows(self.MISSION_SHEET_ID, "missions.csv", "project_id", project_ids)
+
     def _delete_row(self, sheet_id, tab_name, key_col, key_val):
+        return self._delete_rows(sheet_id, tab_name, key_col, [key_val])
+
+    @_synchronized
+    def _delete_rows(self, sheet_id, tab_name, key_col, key_vals):
+        """
+        Delete every row whose key is in key_vals with one batchUpdate.
+        Nothing is deleted if any key cannot be found in the sheet.
+        """
         try:
-            sheet = self.client.open_by_key(sheet_id).worksheet(tab_name)
-            values = sheet.get_all_values()
-            headers = values[0]
-            key_index = headers.index(key_col)
-
-            for idx, row in enumerate(values[1:], start=2):
-                if row[key_index] == key_val:
-                    sheet.delete_rows(idx)
-                    self.reload_data()
-                    return True
-            return False
+            sheet = self._worksheet(sheet_id, tab_name)
+            frame_attr, _ = self._FRAMES[tab_name]
+            df = getattr(self, frame_attr)
+            key_index = list(df.columns).index(key_col)
+
+            # The index may be stale and deletes can't be undone, so check each
+            # row against a live read of the key column first
+            keys = self._api(sheet.col_values, key_index + 1)
+            row_index = getattr(self, self._ROW_INDEXES[tab_name])
+            rows, all_cached = set(), True
+            for key_val in key_vals:
+                idx, cached = self._live_row(keys, row_index, key_val)
+                if idx is None:
+                    return False
+                rows.add(idx)
+                all_cached = all_cached and cached
+            if not rows:
+                return True
+
+            # Bottom-up so earlier deletions don't shift the rows still to go; like
+            # appends, only retried on 429 since a replay would delete shifted rows
+            self._api(self._spreadsheet(sheet_id).batch_update, {"requests": [
+                {"deleteDimension": {"range": {
+                    "sheetId": sheet.id, "dimension": "ROWS", "startIndex": idx - 1, "endIndex": idx
+                }}}
+                for idx in sorted(rows, reverse=True)
+            ]}, retry_statuses=(429,))
+            if all_cached:
+                setattr(self, frame_attr, df.drop(df.index[[idx - 2 for idx in rows]]).reset_index(drop=True))
+                _cached_read.clear()
+                self._refresh_views()
+            else:
+                self.reload_data(update=True)
+            return True
         except Exception as e:
+            self._reopen_if_unauthorized(e)
             print("Delete failed:", e)
             return False
+
+
+@st.cache_resource(show_spinner=False)
+def get_sheets_manager():
+    """Process-wide SheetsManager, so auth and the initial load happen once"""
+    return SheetsManager()